@@ -5,8 +5,13 @@ Controller (E3) - corrected:
  - publishes commands on IDs 16..17
  - uses VSI timing for dt (derived from getSimulationStep)
  - unchanged control law otherwise
+ - per-step control law runs in one numba-compiled kernel call
+ - reference path uses a table-based sine instead of libm sin/cos
 """
 import struct, sys, argparse, math
+import numpy as np
+
+from numba import njit
 
 PythonGateways = 'pythonGateways/'
 sys.path.append(PythonGateways)
@@ -16,6 +21,101 @@ import VsiCanPythonGateway as vsiCanPythonGateway
 
 DEFAULT_DT = 0.02
 
+# CAN payload layout: one native-endian double
+_DOUBLE = struct.Struct('=d')
+
+# path ids used by the compiled kernel (resolved once from --path-type)
+PATH_STRAIGHT, PATH_SINE, PATH_CURVED = 0, 1, 2
+PATH_IDS = {'straight': PATH_STRAIGHT, 'sine': PATH_SINE, 'curved': PATH_CURVED}
+
+# path shapes: sine y = A*sin(W*x); curved y = A*x + B*sin(W*x)
+_SINE_PATH_A, _SINE_PATH_W = 2.0, 0.5
+_CURVED_A, _CURVED_B, _CURVED_W = 0.5, 2.0, 0.2
+# slope factors of the derivatives, folded once at import
+_SINE_PATH_AW = _SINE_PATH_A * _SINE_PATH_W
+_CURVED_BW = _CURVED_B * _CURVED_W
+
+TWO_PI = 2.0 * math.pi
+INV_TWO_PI = 1.0 / TWO_PI
+HALF_PI = 0.5 * math.pi
+
+# first-quadrant sine table; other quadrants are folded onto it by symmetry
+SINE_TABLE_SIZE = 1024
+_SINE = np.sin(np.linspace(0.0, HALF_PI, SINE_TABLE_SIZE + 1)).astype(np.float64)
+_SINE_SCALE = SINE_TABLE_SIZE / HALF_PI
+
+
+@njit(cache=True, fastmath=True)
+def fast_sin(x):
+    """sin(x) from the quadrant table with linear interpolation (|err| < 3e-7)."""
+    x -= TWO_PI * math.floor(x * INV_TWO_PI)             # x in [0, 2*pi)
+    sign = math.copysign(1.0, math.pi - x)               # negative half-wave
+    q = HALF_PI - abs(HALF_PI - abs(x - math.pi))        # fold onto [0, pi/2]
+    f = q * _SINE_SCALE
+    i = min(int(f), SINE_TABLE_SIZE - 1)
+    f -= i
+    return sign * (_SINE[i] + f * (_SINE[i + 1] - _SINE[i]))
+
+
+@njit(cache=True, fastmath=True)
+def fast_cos(x):
+    return fast_sin(x + HALF_PI)
+
+
+# reference paths: each returns (y_ref, dy/dx) at x
+@njit(cache=True, fastmath=True)
+def _ref_sine(x):
+    y = _SINE_PATH_A * fast_sin(_SINE_PATH_W * x)
+    dy_dx = _SINE_PATH_AW * fast_cos(_SINE_PATH_W * x)
+    return y, dy_dx
+
+
+@njit(cache=True, fastmath=True)
+def _ref_curved(x):
+    # same curved model as visualizer/simulator interpretation (if used)
+    y = _CURVED_A * x + _CURVED_B * fast_sin(_CURVED_W * x)
+    dy_dx = _CURVED_A + _CURVED_BW * fast_cos(_CURVED_W * x)
+    return y, dy_dx
+
+
+@njit(cache=True, fastmath=True)
+def _reference(x, path_id):
+    # PATH_STRAIGHT is short-circuited in _step; it lands in the else branch here
+    if path_id == PATH_SINE:
+        return _ref_sine(x)
+    elif path_id == PATH_CURVED:
+        return _ref_curved(x)
+    else:
+        return 0.0, 0.0
+
+
+# explicit signature: compiled eagerly at import (or loaded from the cache)
+# instead of lazily inside the first VSI step
+@njit('UniTuple(float64, 3)(float64, float64, float64, float64, float64,'
+      ' float64, float64, float64, float64, int64)', cache=True, fastmath=True)
+def _step(x, y, theta, prev_lat_err, dt, Kp_lat, Kd_lat, Kp_head, v_nom, path_id):
+    """One control step: returns (v_cmd, omega_cmd, lat_err)."""
+    # reference and errors (straight path: no trig at all)
+    if path_id == PATH_STRAIGHT:
+        y_ref = dy_dx = desired_theta = 0.0
+    else:
+        y_ref, dy_dx = _reference(x, path_id)
+        desired_theta = math.atan(dy_dx)
+
+    lat_err = y_ref - y
+    heading_err = desired_theta - theta
+    heading_err -= TWO_PI * math.floor((heading_err + math.pi) * INV_TWO_PI)  # wrap to [-pi, pi)
+    d_lat = (lat_err - prev_lat_err) / dt
+
+    # control law (PD + heading + feedforward)
+    omega_cmd = (Kp_lat * lat_err +
+                 Kd_lat * d_lat +
+                 Kp_head * heading_err +
+                 dy_dx * 0.5)
+
+    v_cmd = v_nom * max(0.3, 1.0 - abs(heading_err))
+    return v_cmd, omega_cmd, lat_err
+
 
 class Controller:
     def __init__(self, args):
@@ -38,21 +138,7 @@ class Controller:
         self.totalSimulationTimeNs = 0
 
         self.path_type = args.path_type
-
-    def reference_path(self, x):
-        if self.path_type == "straight":
-            return 0.0, 0.0
-        elif self.path_type == "sine":
-            y = 2.0 * math.sin(0.5 * x)
-            dy_dx = 2.0 * 0.5 * math.cos(0.5 * x)
-            return y, dy_dx
-        elif self.path_type == "curved":
-            # same curved model as visualizer/simulator interpretation (if used)
-            y = 0.5 * x + 2.0 * math.sin(0.2 * x)
-            dy_dx = 0.5 + 2.0 * 0.2 * math.cos(0.2 * x)
-            return y, dy_dx
-        else:
-            return 0.0, 0.0
+        self.path_id = PATH_IDS.get(self.path_type, PATH_STRAIGHT)
 
     def mainThread(self):
         dSession = vsiCommonPythonApi.connectToServer(self.localHost, self.domain, self.portNum, self.componentId)
@@ -68,55 +154,59 @@ class Controller:
             self.simulationStepNs = int(DEFAULT_DT * 1e9)
             self.simulationStep = DEFAULT_DT
 
-        nextExpectedTime = vsiCommonPythonApi.getSimulationTimeInNs()
+        dt = self.simulationStep if self.simulationStep > 0 else DEFAULT_DT
 
-        while vsiCommonPythonApi.getSimulationTimeInNs() < self.totalSimulationTimeNs:
-            # safe receive state (IDs 12..14)
-            x = self.safe_recv_double(12, default=0.0)
-            y = self.safe_recv_double(13, default=0.0)
-            theta = self.safe_recv_double(14, default=0.0)
+        recv = vsiCanPythonGateway.recvVariableFromCanPacket
+        unpack_from = _DOUBLE.unpack_from
+        setCanId = vsiCanPythonGateway.setCanId
+        setCanPayloadBits = vsiCanPythonGateway.setCanPayloadBits
+        setDataLengthInBits = vsiCanPythonGateway.setDataLengthInBits
+        sendCanPacket = vsiCanPythonGateway.sendCanPacket
+        pack = _DOUBLE.pack
 
-            # reference and errors
-            y_ref, dy_dx = self.reference_path(x)
-            desired_theta = math.atan2(dy_dx, 1.0)
+        step = _step
+        sim_time = vsiCommonPythonApi.getSimulationTimeInNs
+        advance = vsiCommonPythonApi.advanceSimulation
 
-            lat_err = y_ref - y
-            heading_err = (desired_theta - theta + math.pi) % (2 * math.pi) - math.pi
-            d_lat = (lat_err - self.prev_lat_err) / (self.simulationStep if self.simulationStep>0 else DEFAULT_DT)
-            self.prev_lat_err = lat_err
+        nextExpectedTime = sim_time()
 
-            # control law (PD + heading + feedforward)
-            omega_cmd = (self.Kp_lat * lat_err +
-                         self.Kd_lat * d_lat +
-                         self.Kp_head * heading_err +
-                         dy_dx * 0.5)
+        while True:
+            now = sim_time()
+            if now >= self.totalSimulationTimeNs:
+                break
 
-            v_cmd = self.v_nom * max(0.3, 1.0 - abs(heading_err))
+            # safe receive state (IDs 12..14)
+            try:
+                packed = recv(8, 0, 64, 12)
+            except Exception:
+                packed = None
+            x = unpack_from(packed)[0] if packed else 0.0
+            try:
+                packed = recv(8, 0, 64, 13)
+            except Exception:
+                packed = None
+            y = unpack_from(packed)[0] if packed else 0.0
+            try:
+                packed = recv(8, 0, 64, 14)
+            except Exception:
+                packed = None
+            theta = unpack_from(packed)[0] if packed else 0.0
+
+            # reference, errors and control law (compiled kernel)
+            v_cmd, omega_cmd, self.prev_lat_err = step(
+                x, y, theta, self.prev_lat_err, dt,
+                self.Kp_lat, self.Kd_lat, self.Kp_head, self.v_nom, self.path_id)
 
             # publish commands on IDs 16,17
-            self.send_double(16, v_cmd)
-            self.send_double(17, omega_cmd)
+            for cid, val in ((16, v_cmd), (17, omega_cmd)):
+                setCanId(cid)
+                setCanPayloadBits(pack(val), 0, 64)
+                setDataLengthInBits(64)
+                sendCanPacket()
 
             # advance VSI simulation
             nextExpectedTime += self.simulationStepNs
-            vsiCommonPythonApi.advanceSimulation(nextExpectedTime - vsiCommonPythonApi.getSimulationTimeInNs())
-
-    def safe_recv_double(self, cid, default=0.0):
-        try:
-            packed = vsiCanPythonGateway.recvVariableFromCanPacket(8, 0, 64, cid)
-        except Exception:
-            packed = None
-        if not packed:
-            return default
-        n = struct.calcsize('=d')
-        return struct.unpack('=d', packed[:n])[0]
-
-    def send_double(self, cid, val):
-        vsiCanPythonGateway.setCanId(cid)
-        payload = struct.pack('=d', float(val))
-        vsiCanPythonGateway.setCanPayloadBits(payload, 0, 64)
-        vsiCanPythonGateway.setDataLengthInBits(64)
-        vsiCanPythonGateway.sendCanPacket()
+            advance(nextExpectedTime - now)
 
 def parse_args():
     p = argparse.ArgumentParser()
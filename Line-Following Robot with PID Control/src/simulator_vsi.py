@@ -6,11 +6,14 @@ Simulator (E3) - corrected:
  - noise: Gaussian on v and omega (std = --noise)
  - disturbance: occasional transient angular impulse (magnitude = --disturbance)
  - uses VSI timing (getSimulationStep/getSimulationTimeInNs/advanceSimulation) correctly
+ - dynamics step runs in a numba-compiled kernel
 """
 from __future__ import print_function
 import struct, sys, argparse, math, random
 import numpy as np
 
+from numba import njit
+
 PythonGateways = 'pythonGateways/'
 sys.path.append(PythonGateways)
 
@@ -18,6 +21,21 @@ import VsiCommonPythonApi as vsiCommonPythonApi
 import VsiCanPythonGateway as vsiCanPythonGateway
 
 DEFAULT_DT = 0.02  # seconds (if VSI step is 0)
+NOISE_BLOCK = 8192  # Gaussian samples drawn per refill (consumed two per step)
+
+# CAN payload layout: one native-endian double
+_DOUBLE = struct.Struct('=d')
+
+
+@njit(cache=True, fastmath=True)
+def _sim_step(x, y, theta, v, omega, noise_v, noise_omega, dist_omega, dt):
+    """Euler step of the noisy unicycle model: returns the new (x, y, theta)."""
+    v_noisy = v + noise_v
+    omega_noisy = omega + noise_omega + dist_omega
+    x += v_noisy * math.cos(theta) * dt
+    y += v_noisy * math.sin(theta) * dt
+    theta += omega_noisy * dt
+    return x, y, theta
 
 
 class Simulator:
@@ -43,9 +61,15 @@ class Simulator:
         self.dist_prob = args.dist_prob
         self.dist_duration_s = args.dist_duration
 
+        # pre-sampled noise, refilled in blocks
+        self._rng = np.random.default_rng()
+        self._noise_buf = []
+        self._noise_i = NOISE_BLOCK
+
         # internal disturbance state
         self._dist_counter = 0
         self._dist_omega = 0.0
+        self._dist_counter_reset = 1  # steps per disturbance, set once timing is known
 
         # VSI timing
         self.simulationStepNs = 0
@@ -66,66 +90,85 @@ class Simulator:
             self.simulationStepNs = int(DEFAULT_DT * 1e9)
             self.simulationStep = DEFAULT_DT
 
-        nextExpectedTime = vsiCommonPythonApi.getSimulationTimeInNs()
+        # loop-invariant disturbance length (in steps)
+        self._dist_counter_reset = max(1, int(self.dist_duration_s / self.simulationStep))
 
-        while vsiCommonPythonApi.getSimulationTimeInNs() < self.totalSimulationTimeNs:
-            # safely receive control (IDs 16,17). If packet empty, keep previous values.
-            v_val, _ = self.safe_recv_double(16, default=self.v)
-            omega_val, _ = self.safe_recv_double(17, default=self.omega)
-            self.v = v_val
-            self.omega = omega_val
+        recv = vsiCanPythonGateway.recvVariableFromCanPacket
+        unpack_from = _DOUBLE.unpack_from
+        setCanId = vsiCanPythonGateway.setCanId
+        setCanPayloadBits = vsiCanPythonGateway.setCanPayloadBits
+        setDataLengthInBits = vsiCanPythonGateway.setDataLengthInBits
+        sendCanPacket = vsiCanPythonGateway.sendCanPacket
+        pack = _DOUBLE.pack
+        _rand = random.random
+        sim_step = _sim_step
+        dt = self.simulationStep
 
-            # noise
-            v_noisy = self.v + random.gauss(0.0, self.noise_std)
-            omega_noisy = self.omega + random.gauss(0.0, self.noise_std)
+        sim_time = vsiCommonPythonApi.getSimulationTimeInNs
+        advance = vsiCommonPythonApi.advanceSimulation
+
+        nextExpectedTime = sim_time()
+
+        while True:
+            now = sim_time()
+            if now >= self.totalSimulationTimeNs:
+                break
+
+            # safely receive control (IDs 16,17). If packet empty, keep previous values.
+            try:
+                packed = recv(8, 0, 64, 16)
+            except Exception:
+                packed = None
+            self.v = unpack_from(packed)[0] if packed else self.v
+            try:
+                packed = recv(8, 0, 64, 17)
+            except Exception:
+                packed = None
+            self.omega = unpack_from(packed)[0] if packed else self.omega
+
+            # noise (sampled here so the kernel stays pure arithmetic)
+            i = self._noise_i
+            if i + 2 > NOISE_BLOCK:  # a full (v, omega) pair must be left, even for an odd block
+                self.refill_noise()
+                i = 0
+            noise_v = self._noise_buf[i]
+            noise_omega = self._noise_buf[i + 1]
+            self._noise_i = i + 2
 
             # occasional transient disturbance: set counter and dist omega
-            if self._dist_counter <= 0 and self.disturbance > 0 and random.random() < self.dist_prob:
-                sign = 1 if random.random() < 0.5 else -1
+            if self._dist_counter <= 0 and self.disturbance > 0 and _rand() < self.dist_prob:
+                sign = 1 if _rand() < 0.5 else -1
                 self._dist_omega = sign * self.disturbance
-                self._dist_counter = max(1, int(self.dist_duration_s / self.simulationStep))
+                self._dist_counter = self._dist_counter_reset
 
+            dist_omega = 0.0
             if self._dist_counter > 0:
-                omega_noisy += self._dist_omega
+                dist_omega = self._dist_omega
                 self._dist_counter -= 1
                 if self._dist_counter == 0:
                     self._dist_omega = 0.0
 
-            # propagate dynamics
-            self.x += v_noisy * math.cos(self.theta) * self.simulationStep
-            self.y += v_noisy * math.sin(self.theta) * self.simulationStep
-            self.theta += omega_noisy * self.simulationStep
-            self.t += self.simulationStep
+            # propagate dynamics (compiled kernel)
+            self.x, self.y, self.theta = sim_step(
+                self.x, self.y, self.theta, self.v, self.omega,
+                noise_v, noise_omega, dist_omega, dt)
+            self.t += dt
 
             # publish state (12..15)
-            self.send_double(12, self.x)
-            self.send_double(13, self.y)
-            self.send_double(14, self.theta)
-            self.send_double(15, self.t)
+            for cid, val in ((12, self.x), (13, self.y), (14, self.theta), (15, self.t)):
+                setCanId(cid)
+                setCanPayloadBits(pack(val), 0, 64)
+                setDataLengthInBits(64)
+                sendCanPacket()
 
             # advance simulation in VSI (ns)
             nextExpectedTime += self.simulationStepNs
-            vsiCommonPythonApi.advanceSimulation(nextExpectedTime - vsiCommonPythonApi.getSimulationTimeInNs())
-
-    # helper: safe recv returning default if no data
-    def safe_recv_double(self, cid, default=0.0):
-        packed = None
-        try:
-            packed = vsiCanPythonGateway.recvVariableFromCanPacket(8, 0, 64, cid)
-        except Exception:
-            packed = None
-        if not packed:
-            return default, b''
-        n = struct.calcsize('=d')
-        val = struct.unpack('=d', packed[:n])[0]
-        return val, packed[n:]
-
-    def send_double(self, cid, val):
-        vsiCanPythonGateway.setCanId(cid)
-        payload = struct.pack('=d', float(val))
-        vsiCanPythonGateway.setCanPayloadBits(payload, 0, 64)
-        vsiCanPythonGateway.setDataLengthInBits(64)
-        vsiCanPythonGateway.sendCanPacket()
+            advance(nextExpectedTime - now)
+
+    def refill_noise(self):
+        # one vectorized draw replaces NOISE_BLOCK random.gauss calls
+        self._noise_buf = (self._rng.standard_normal(NOISE_BLOCK) * self.noise_std).tolist()
+        self._noise_i = 0
 
 def parse_args():
     ap = argparse.ArgumentParser()
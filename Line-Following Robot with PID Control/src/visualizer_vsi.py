@@ -3,10 +3,13 @@
 Visualizer (E3) - corrected:
  - reads x,y from IDs 12,13 (safe recv)
  - builds trajectory, plots against reference
+ - plotting runs in its own process, fed (x,y) samples through a shared-memory ring
  - computes & appends KPIs to E3_results.csv (includes noise/disturbance)
  - uses VSI timing consistently
 """
 import struct, sys, argparse, math, csv, os
+import multiprocessing as mp
+from multiprocessing import shared_memory
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -17,6 +20,84 @@ import VsiCommonPythonApi as vsiCommonPythonApi
 import VsiCanPythonGateway as vsiCanPythonGateway
 
 DEFAULT_DT = 0.02
+REDRAW_PERIOD = 0.05  # seconds between plot refreshes (<= 20 Hz)
+
+# CAN payload layout: one native-endian double
+_DOUBLE = struct.Struct('=d')
+
+# path shapes, kept in step with controller_vsi: sine y = A*sin(W*x);
+# curved y = A*x + B*sin(W*x)
+_SINE_PATH_A, _SINE_PATH_W = 2.0, 0.5
+_CURVED_A, _CURVED_B, _CURVED_W = 0.5, 2.0, 0.2
+
+
+def _padded(lo, hi, pad=0.1):
+    span = (hi - lo) or 1.0
+    return lo - pad * span, hi + pad * span
+
+
+def plot_process(shm_name, ring_len, count, done, path_x, path_y):
+    """Plotter process: follows the sample ring and blits the trajectory every REDRAW_PERIOD."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = np.ndarray((ring_len, 2), dtype=np.float64, buffer=shm.buf)
+    xs = np.empty(ring_len); ys = np.empty(ring_len)
+    n = 0; read = 0
+
+    fig, ax = plt.subplots()
+    line_robot, = ax.plot([], [], 'b-', label='Trajectory', animated=True)
+    ax.plot(path_x, path_y, 'r--', label='Reference')
+    ax.legend(); ax.grid(True)
+    # fixed limits (path extents); only widened when the robot leaves them
+    ax.set_xlim(*_padded(np.min(path_x), np.max(path_x)))
+    ax.set_ylim(*_padded(np.min(path_y), np.max(path_y)))
+
+    # static background is recaptured after every full draw (start, resize, new limits)
+    bg = None
+    def on_draw(event):
+        nonlocal bg
+        bg = fig.canvas.copy_from_bbox(ax.bbox)
+        ax.draw_artist(line_robot)
+    fig.canvas.mpl_connect('draw_event', on_draw)
+    plt.show(block=False)
+    fig.canvas.draw()
+
+    while True:
+        # check done before count so the last samples are always picked up
+        finished = done.is_set()
+        written = count.value
+        # the ring holds a whole run, so this only drops samples if VSI delivers
+        # more than the expected step count faster than one REDRAW_PERIOD
+        new = min(written - read, ring_len)
+        if new > 0:
+            if n + new > len(xs):
+                xs = np.concatenate((xs, np.empty(len(xs))))
+                ys = np.concatenate((ys, np.empty(len(ys))))
+            idx = np.arange(written - new, written) % ring_len
+            xs[n:n + new] = ring[idx, 0]; ys[n:n + new] = ring[idx, 1]
+            new_x = xs[n:n + new]; new_y = ys[n:n + new]
+            n += new; read = written
+
+            line_robot.set_data(xs[:n], ys[:n])
+            (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+            if new_x.min() < x0 or new_x.max() > x1 or new_y.min() < y0 or new_y.max() > y1:
+                ax.set_xlim(*_padded(min(x0, new_x.min()), max(x1, new_x.max())))
+                ax.set_ylim(*_padded(min(y0, new_y.min()), max(y1, new_y.max())))
+                fig.canvas.draw()
+            else:
+                fig.canvas.restore_region(bg)
+                ax.draw_artist(line_robot)
+                fig.canvas.blit(ax.bbox)
+        fig.canvas.flush_events()
+        if finished:
+            break
+        fig.canvas.start_event_loop(REDRAW_PERIOD)
+
+    del ring
+    shm.close()
+    # final static figure: draw the trajectory as a regular artist
+    line_robot.set_animated(False)
+    plt.show()
+
 
 class Visualizer:
     def __init__(self, args):
@@ -25,8 +106,10 @@ class Visualizer:
         self.domain = args.domain
         self.portNum = args.port if args.port is not None else 50103
 
-        self.traj_x = []
-        self.traj_y = []
+        # trajectory buffers, preallocated once the VSI step count is known
+        self.traj_x = np.empty(0)
+        self.traj_y = np.empty(0)
+        self._i = 0
 
         self.path_type = args.path_type
         self.path_length = args.path_length
@@ -41,20 +124,21 @@ class Visualizer:
         self.simulationStep = DEFAULT_DT
         self.totalSimulationTimeNs = 0
 
-        plt.ion()
-        self.fig, self.ax = plt.subplots()
-        self.line_robot, = self.ax.plot([], [], 'b-', label='Trajectory')
-        self.line_path, = self.ax.plot(self.path_x, self.path_y, 'r--', label='Reference')
-        self.ax.legend(); self.ax.grid(True)
+        # plotter process and the sample ring it reads (set up in start_plotter)
+        self._ring_shm = None
+        self._ring = None
+        self._ring_count = None
+        self._plot_done = None
+        self._plotter = None
 
     def make_reference(self):
         xs = np.linspace(0, self.path_length, 400)
         if self.path_type == 'straight':
             ys = np.zeros_like(xs)
         elif self.path_type == 'sine':
-            ys = np.sin(xs * 0.5) * 2.0
+            ys = _SINE_PATH_A * np.sin(_SINE_PATH_W * xs)
         elif self.path_type == 'curved':
-            ys = 0.5 * xs + 2.0 * np.sin(0.2 * xs)
+            ys = _CURVED_A * xs + _CURVED_B * np.sin(_CURVED_W * xs)
         else:
             ys = np.zeros_like(xs)
         return xs, ys
@@ -72,51 +156,107 @@ class Visualizer:
             self.simulationStepNs = int(DEFAULT_DT * 1e9)
             self.simulationStep = DEFAULT_DT
 
-        nextExpectedTime = vsiCommonPythonApi.getSimulationTimeInNs()
+        n_steps = int(self.totalSimulationTimeNs // self.simulationStepNs) + 16
+        self.traj_x = np.empty(n_steps)
+        self.traj_y = np.empty(n_steps)
+        self._i = 0
 
-        while vsiCommonPythonApi.getSimulationTimeInNs() < self.totalSimulationTimeNs:
-            x = self.safe_recv_double(12, default=None)
-            y = self.safe_recv_double(13, default=None)
-            if x is not None and y is not None:
-                self.traj_x.append(x); self.traj_y.append(y)
+        completed = False
+        try:
+            # the ring is sized for the whole run so the plotter can lag freely
+            self.start_plotter(n_steps)
+            self.run_loop()
+            # finalize and compute metrics; the plot window stays open until closed
+            self._plot_done.set()
+            self.save_metrics()
+            completed = True
+        finally:
+            # on errors, don't wait for the plot window or leak the shared memory
+            self.stop_plotter(wait=completed)
 
-                self.line_robot.set_data(self.traj_x, self.traj_y)
-                self.ax.relim(); self.ax.autoscale_view()
-                plt.pause(0.01)
+    def run_loop(self):
+        recv = vsiCanPythonGateway.recvVariableFromCanPacket
+        unpack_from = _DOUBLE.unpack_from
+        ring = self._ring
+        ring_len = len(ring)
+        ring_count = self._ring_count
+
+        sim_time = vsiCommonPythonApi.getSimulationTimeInNs
+        advance = vsiCommonPythonApi.advanceSimulation
+
+        nextExpectedTime = sim_time()
+
+        while True:
+            now = sim_time()
+            if now >= self.totalSimulationTimeNs:
+                break
+
+            # safe receive x,y (IDs 12,13)
+            try:
+                packed = recv(8, 0, 64, 12)
+            except Exception:
+                packed = None
+            x = unpack_from(packed)[0] if packed else None
+            try:
+                packed = recv(8, 0, 64, 13)
+            except Exception:
+                packed = None
+            y = unpack_from(packed)[0] if packed else None
+            if x is not None and y is not None:
+                i = self._i
+                if i == len(self.traj_x):
+                    # more samples than expected steps: double the buffers
+                    self.traj_x = np.concatenate((self.traj_x, np.empty(i)))
+                    self.traj_y = np.concatenate((self.traj_y, np.empty(i)))
+                self.traj_x[i] = x; self.traj_y[i] = y
+                ring[i % ring_len] = x, y
+                self._i = i = i + 1
+                ring_count.value = i
 
             # advance
             nextExpectedTime += self.simulationStepNs
-            vsiCommonPythonApi.advanceSimulation(nextExpectedTime - vsiCommonPythonApi.getSimulationTimeInNs())
+            advance(nextExpectedTime - now)
 
-        # finalize and compute metrics
-        plt.ioff(); plt.show()
-        self.save_metrics()
+    def start_plotter(self, ring_len):
+        self._ring_shm = shared_memory.SharedMemory(create=True, size=ring_len * 2 * 8)
+        self._ring = np.ndarray((ring_len, 2), dtype=np.float64, buffer=self._ring_shm.buf)
+        self._ring_count = mp.RawValue('q', 0)
+        self._plot_done = mp.Event()
+        plotter = mp.Process(target=plot_process,
+                             args=(self._ring_shm.name, ring_len, self._ring_count,
+                                   self._plot_done, self.path_x, self.path_y))
+        plotter.start()
+        self._plotter = plotter
 
-    def safe_recv_double(self, cid, default=None):
-        try:
-            packed = vsiCanPythonGateway.recvVariableFromCanPacket(8, 0, 64, cid)
-        except Exception:
-            packed = None
-        if not packed:
-            return default
-        n = struct.calcsize('=d')
-        return struct.unpack('=d', packed[:n])[0]
+    def stop_plotter(self, wait=True):
+        # wait=False terminates the plotter instead of waiting for its window to close
+        if self._plotter is not None:
+            self._plot_done.set()
+            if not wait:
+                self._plotter.terminate()
+            self._plotter.join()
+            self._plotter = None
+        if self._ring_shm is not None:
+            self._ring = None
+            self._ring_shm.close()
+            self._ring_shm.unlink()
+            self._ring_shm = None
 
     def save_metrics(self):
-        if len(self.traj_x) == 0:
+        if self._i == 0:
             print("Visualizer: no trajectory samples collected.")
             return
-        ref_y = np.interp(self.traj_x, self.path_x, self.path_y)
-        errors = np.array(self.traj_y) - ref_y
+        traj_x = self.traj_x[:self._i]
+        traj_y = self.traj_y[:self._i]
+        ref_y = np.interp(traj_x, self.path_x, self.path_y)
+        errors = traj_y - ref_y
 
         overshoot = float(np.max(np.abs(errors)))
         final_value = float(errors[-1])
         tol = 0.05
-        settling_time = len(errors)
-        for i in range(len(errors)):
-            if np.all(np.abs(errors[i:] - final_value) <= tol):
-                settling_time = i
-                break
+        # settling time: first sample after the last one outside the tolerance band
+        outside = ~(np.abs(errors - final_value) <= tol)  # NaN counts as outside, as before
+        settling_time = int(np.flatnonzero(outside)[-1]) + 1 if outside.any() else 0
         steady_state_error = float(np.mean(errors[-max(1, len(errors)//10):]))
 
         file_exists = os.path.isfile('E3_results.csv')